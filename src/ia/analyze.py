@@ -11,10 +11,10 @@ layered on top of this by wiring in external embeddings or LLMs through
 
 from __future__ import annotations
 
-import json
 import re
 from typing import Dict, Any, List
 
+import orjson
 import typer
 
 from . import db as db_module
@@ -34,45 +34,41 @@ ERROR_KEYWORDS = [
     "didn't work",
 ]
 
+# single case-insensitive pass over the content for any of the keywords
+ERROR_RE = re.compile("|".join(re.escape(kw) for kw in ERROR_KEYWORDS), re.IGNORECASE)
 
-def _detect_ghosts(conversation_id: str, conn) -> List[Dict[str, Any]]:
+# SQL predicate selecting messages that contain any of the keywords; LIKE is
+# a case-insensitive substring test for these ASCII keywords, as ERROR_RE is
+ERROR_LIKE = " OR ".join("last_content LIKE ?" for _ in ERROR_KEYWORDS)
+ERROR_LIKE_ARGS = tuple(f"%{kw}%" for kw in ERROR_KEYWORDS)
+
+
+def _detect_ghosts(current_node: str | None, role: str | None, content: str | None) -> List[Dict[str, Any]]:
     """Identify potential ghost problems in a conversation.
 
     Currently, this examines the last message in the conversation (as
     recorded by conversations.current_node) and checks if the author was
     the user and if the content contains error keywords.  If so, the
     conversation is flagged as having an unresolved problem.
+
+    Args:
+        current_node: ID of the conversation's current node, if any.
+        role: Author role of the current node, or None if it wasn't stored.
+        content: Text of the current node, or None if it wasn't stored.
     """
-    cur = conn.cursor()
-    convo = cur.execute(
-        "SELECT current_node, title FROM conversations WHERE id = ?",
-        (conversation_id,),
-    ).fetchone()
-    if not convo:
-        return []
-    current_node = convo["current_node"]
     if not current_node:
         return []
-    # fetch node details
-    node = cur.execute(
-        "SELECT role, content FROM nodes WHERE id = ?",
-        (current_node,),
-    ).fetchone()
     ghosts: List[Dict[str, Any]] = []
-    if node:
-        role = node["role"] or ""
-        content = node["content"] or ""
-        if role.lower() == "user":
-            lower_content = content.lower()
-            for kw in ERROR_KEYWORDS:
-                if kw in lower_content:
-                    ghosts.append(
-                        {
-                            "description": f"Unresolved user message containing '{kw}'",
-                            "evidence": [current_node],
-                        }
-                    )
-                    break
+    if (role or "").lower() == "user":
+        m = ERROR_RE.search(content or "")
+        if m:
+            kw = m.group(0).lower()
+            ghosts.append(
+                {
+                    "description": f"Unresolved user message containing '{kw}'",
+                    "evidence": [current_node],
+                }
+            )
     return ghosts
 
 
@@ -80,26 +76,43 @@ def _detect_ghosts(conversation_id: str, conn) -> List[Dict[str, Any]]:
 def analyze(db_path: str = typer.Option(..., help="Path to SQLite DB"), out: str = typer.Option(..., help="Path to output JSON file")) -> None:
     """Analyse the ingested data and produce a summary of projects and ghost problems."""
     conn = db_module.get_connection(db_path)
+    # upgrades a database created by an earlier release
+    db_module.init_db(conn)
     cur = conn.cursor()
+    # collect all node ids for evidence in one scan, grouped by conversation
+    node_ids_by_convo: Dict[str, List[str]] = {}
+    # (ordered by rowid to keep ingest order rather than the index's id order)
+    for convo_id, node_id in cur.execute("SELECT conversation_id, id FROM nodes ORDER BY rowid"):
+        node_ids_by_convo.setdefault(convo_id, []).append(node_id)
+    # SQLite narrows ghost candidates to current user messages containing a
+    # keyword, using the copy of the current node stored on the conversation;
+    # _detect_ghosts confirms each and names the keyword
+    ghosts_by_convo: Dict[str, List[Dict[str, Any]]] = {}
+    for row in cur.execute(
+        f"""
+        SELECT id, current_node, last_role, last_content
+        FROM conversations
+        WHERE lower(last_role) = 'user' AND ({ERROR_LIKE})
+        """,
+        ERROR_LIKE_ARGS,
+    ):
+        ghosts = _detect_ghosts(row["current_node"], row["last_role"], row["last_content"])
+        if ghosts:
+            ghosts_by_convo[row["id"]] = ghosts
     projects: List[Dict[str, Any]] = []
     # each conversation is treated as a project in this baseline implementation
     for convo in cur.execute("SELECT id, title FROM conversations"):
         convo_id = convo["id"]
-        title = convo["title"]
-        # collect all node ids for evidence
-        node_ids = [row["id"] for row in cur.execute(
-            "SELECT id FROM nodes WHERE conversation_id = ?",
-            (convo_id,),
-        )]
-        ghosts = _detect_ghosts(convo_id, conn)
+        ghosts = ghosts_by_convo.get(convo_id, [])
         projects.append(
             {
                 "project_id": convo_id,
-                "title": title,
-                "node_ids": node_ids,
+                "title": convo["title"],
+                "node_ids": node_ids_by_convo.get(convo_id, []),
                 "ghost_problems": ghosts,
             }
         )
-    with open(out, "w", encoding="utf-8") as f:
-        json.dump({"projects": projects}, f, ensure_ascii=False, indent=2)
+    # orjson encodes straight to UTF-8 bytes in native code
+    with open(out, "wb") as f:
+        f.write(orjson.dumps({"projects": projects}, option=orjson.OPT_INDENT_2))
     typer.echo(f"Analysis complete. Wrote {len(projects)} projects to {out}")
@@ -2,16 +2,61 @@
 
 All data is stored in a single SQLite database.  Conversations, nodes
 and edges are normalised into separate tables and message content is
-indexed via FTS5 for fast full text search.  Additional tables log
-ingest runs and persist arbitrary state (e.g., last run timestamps).
+indexed via an external-content FTS5 table for fast full text search
+(the index stores postings only and reads text back from `nodes`).
+Additional tables log ingest runs and persist arbitrary state (e.g., last
+run timestamps).
 """
 
 from __future__ import annotations
 
+import json
 import sqlite3
 from contextlib import contextmanager
+from itertools import repeat
 from typing import Iterable, Dict, Any
 
+# layout version stored in PRAGMA user_version; bump it whenever init_db
+# changes an existing table and add the matching upgrade step to _migrate
+SCHEMA_VERSION = 2
+
+# nodes table stores each message node and its metadata; the explicit
+# rowid keeps FTS row ids stable across VACUUM
+_CREATE_NODES_SQL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        rowid INTEGER PRIMARY KEY,
+        id TEXT NOT NULL UNIQUE,
+        conversation_id TEXT NOT NULL,
+        parent_id TEXT,
+        role TEXT,
+        content TEXT,
+        create_time REAL,
+        FOREIGN KEY(conversation_id) REFERENCES conversations(id)
+    );
+"""
+
+# nodes whose content is added to the FTS index; insertions into and
+# deletions from the index must use the same predicate
+_FTS_INDEXED = "content IS NOT NULL AND content != ''"
+
+# number of nodes handed to each executemany call in bulk_insert_nodes
+INSERT_CHUNK_SIZE = 1000
+
+_INSERT_NODE_SQL = """
+    INSERT OR REPLACE INTO nodes (id, conversation_id, parent_id, role, content, create_time)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+_INSERT_EDGE_SQL = """
+    INSERT OR REPLACE INTO edges (conversation_id, parent_id, child_id)
+    VALUES (?, ?, ?)
+"""
+
+_INSERT_FTS_SQL = (
+    "INSERT INTO fts_messages (rowid, content) "
+    f"SELECT rowid, content FROM nodes WHERE {_FTS_INDEXED}"
+)
+
 
 def get_connection(db_path: str) -> sqlite3.Connection:
     """Return a SQLite connection with a row factory that yields dictionaries.
@@ -26,13 +71,102 @@ def get_connection(db_path: str) -> sqlite3.Connection:
     conn.row_factory = sqlite3.Row
     # enable WAL for concurrency and performance
     conn.execute("PRAGMA journal_mode=WAL;")
+    # under WAL, NORMAL only syncs at checkpoints and is still crash-safe
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    # 64 MiB page cache, in-memory temp tables and 256 MiB of mmap I/O
+    conn.execute("PRAGMA cache_size=-65536;")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    conn.execute("PRAGMA mmap_size=268435456;")
+    # wait for a concurrent writer instead of failing with SQLITE_BUSY
+    conn.execute("PRAGMA busy_timeout=30000;")
+    # checkpoint less often during large ingests
+    conn.execute("PRAGMA wal_autocheckpoint=10000;")
     return conn
 
 
+def _table_columns(conn: sqlite3.Connection, table: str) -> list[str]:
+    """Return the column names of a table, or an empty list if it doesn't exist."""
+    return [row["name"] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _schema_version(conn: sqlite3.Connection) -> int:
+    """Return the database's schema version.
+
+    Raises:
+        RuntimeError: If the database was created by a newer version.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema version {version} is newer than this release "
+            f"supports ({SCHEMA_VERSION}); upgrade Intent Archaeology."
+        )
+    return version
+
+
+def _migrate(conn: sqlite3.Connection) -> bool:
+    """Upgrade tables created by an earlier schema version in place.
+
+    Returns:
+        True if the FTS index was dropped or its row ids changed, in which
+        case it must be rebuilt once the schema has been created.
+    """
+    version = _schema_version(conn)
+    rebuild_index = False
+    if version < 1:
+        # nodes gained an explicit rowid and fts_messages became an
+        # external-content index keyed by it
+        node_columns = _table_columns(conn, "nodes")
+        if node_columns and "rowid" not in node_columns:
+            conn.execute(_CREATE_NODES_SQL.format(table="nodes_v1"))
+            conn.execute(
+                "INSERT INTO nodes_v1 (id, conversation_id, parent_id, role, content, create_time) "
+                "SELECT id, conversation_id, parent_id, role, content, create_time FROM nodes"
+            )
+            conn.execute("DROP TABLE nodes")
+            conn.execute("ALTER TABLE nodes_v1 RENAME TO nodes")
+            rebuild_index = True
+        if "node_id" in _table_columns(conn, "fts_messages"):
+            conn.execute("DROP TABLE fts_messages")
+            rebuild_index = True
+    if version < 2:
+        # conversations gained a copy of the current node's role and content
+        conversation_columns = _table_columns(conn, "conversations")
+        if conversation_columns:
+            added = [c for c in ("last_role", "last_content") if c not in conversation_columns]
+            for column in added:
+                conn.execute(f"ALTER TABLE conversations ADD COLUMN {column} TEXT")
+            if added:
+                # backfill from the stored nodes; ingest skips unchanged
+                # conversations, so it would never fill these in itself
+                conn.execute(
+                    """
+                    UPDATE conversations SET
+                        last_role = (SELECT role FROM nodes WHERE nodes.id = conversations.current_node),
+                        last_content = (SELECT content FROM nodes WHERE nodes.id = conversations.current_node)
+                    WHERE current_node IS NOT NULL
+                    """
+                )
+    return rebuild_index
+
+
 def init_db(conn: sqlite3.Connection) -> None:
-    """Initialise schema on the provided connection if it doesn't already exist."""
+    """Initialise schema on the provided connection if it doesn't already exist.
+
+    Databases created by an earlier release are upgraded in place and
+    stamped with `SCHEMA_VERSION`; the whole upgrade runs in one
+    transaction.  A database already at `SCHEMA_VERSION` is left untouched,
+    so read-only commands don't wait on a concurrent ingest's write lock.
+    """
+    if _schema_version(conn) == SCHEMA_VERSION:
+        return
     cur = conn.cursor()
-    # conversations table stores metadata for each chat thread
+    # take the write lock up front; _migrate re-reads the version under it
+    # in case another process upgraded the database in the meantime
+    cur.execute("BEGIN IMMEDIATE")
+    rebuild_index = _migrate(conn)
+    # conversations table stores metadata for each chat thread; the role and
+    # content of the current node are copied here so analysis needs no join
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS conversations (
@@ -41,24 +175,13 @@ def init_db(conn: sqlite3.Connection) -> None:
             create_time REAL,
             update_time REAL,
             current_node TEXT,
-            fingerprint TEXT
-        );
-        """
-    )
-    # nodes table stores each message node and its metadata
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS nodes (
-            id TEXT PRIMARY KEY,
-            conversation_id TEXT NOT NULL,
-            parent_id TEXT,
-            role TEXT,
-            content TEXT,
-            create_time REAL,
-            FOREIGN KEY(conversation_id) REFERENCES conversations(id)
+            fingerprint TEXT,
+            last_role TEXT,
+            last_content TEXT
         );
         """
     )
+    cur.execute(_CREATE_NODES_SQL.format(table="nodes"))
     # edges table stores parent/child relationships
     cur.execute(
         """
@@ -73,13 +196,18 @@ def init_db(conn: sqlite3.Connection) -> None:
         );
         """
     )
-    # FTS index for message content; a separate row per node
+    # index for queries that filter nodes by conversation_id
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_nodes_conv ON nodes(conversation_id, id);"
+    )
+    # FTS index for message content keyed by nodes.rowid; join against
+    # nodes to recover node and conversation IDs
     cur.execute(
         """
         CREATE VIRTUAL TABLE IF NOT EXISTS fts_messages USING fts5(
-            node_id,
-            conversation_id,
             content,
+            content='nodes',
+            content_rowid='rowid',
             tokenize='porter'
         );
         """
@@ -107,10 +235,20 @@ def init_db(conn: sqlite3.Connection) -> None:
         );
         """
     )
+    if rebuild_index:
+        rebuild_fts(conn, commit=False)
+    cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
     conn.commit()
 
 
-def upsert_conversation(conn: sqlite3.Connection, convo: Dict[str, Any], fingerprint: str) -> None:
+def upsert_conversation(
+    conn: sqlite3.Connection,
+    convo: Dict[str, Any],
+    fingerprint: str,
+    last_role: str | None = None,
+    last_content: str | None = None,
+    commit: bool = True,
+) -> None:
     """Insert or replace a conversation record.
 
     The fingerprint is stored to support incremental ingestion; if the
@@ -122,17 +260,23 @@ def upsert_conversation(conn: sqlite3.Connection, convo: Dict[str, Any], fingerp
         convo: Dict with keys id, title, create_time, update_time, current_node.
         fingerprint: A hash string summarising key properties of this
             conversation.
+        last_role: Author role of the conversation's current node.
+        last_content: Text of the conversation's current node.
+        commit: Commit immediately.  Pass False when the caller batches
+            several writes into one transaction.
     """
     conn.execute(
         """
-        INSERT INTO conversations (id, title, create_time, update_time, current_node, fingerprint)
-        VALUES (:id, :title, :create_time, :update_time, :current_node, :fingerprint)
+        INSERT INTO conversations (id, title, create_time, update_time, current_node, fingerprint, last_role, last_content)
+        VALUES (:id, :title, :create_time, :update_time, :current_node, :fingerprint, :last_role, :last_content)
         ON CONFLICT(id) DO UPDATE SET
             title=excluded.title,
             create_time=excluded.create_time,
             update_time=excluded.update_time,
             current_node=excluded.current_node,
-            fingerprint=excluded.fingerprint;
+            fingerprint=excluded.fingerprint,
+            last_role=excluded.last_role,
+            last_content=excluded.last_content;
         """,
         {
             "id": convo["id"],
@@ -141,77 +285,137 @@ def upsert_conversation(conn: sqlite3.Connection, convo: Dict[str, Any], fingerp
             "update_time": convo.get("update_time"),
             "current_node": convo.get("current_node"),
             "fingerprint": fingerprint,
+            "last_role": last_role,
+            "last_content": last_content,
         },
     )
-    conn.commit()
+    if commit:
+        conn.commit()
 
 
-def delete_conversation(conn: sqlite3.Connection, conversation_id: str) -> None:
+def delete_conversation(conn: sqlite3.Connection, conversation_id: str, commit: bool = True) -> None:
     """Delete all rows associated with the conversation from nodes, edges and fts."""
+    delete_conversations(conn, [conversation_id], commit=commit)
+
+
+def delete_conversations(conn: sqlite3.Connection, conversation_ids: Iterable[str], commit: bool = True) -> None:
+    """Delete all rows associated with several conversations at once.
+
+    The IDs are bound as a single JSON array and expanded with `json_each`,
+    so each table is cleared with one statement however many conversations
+    are removed.
+
+    Args:
+        conn: Database connection.
+        conversation_ids: IDs of the conversations to delete.
+        commit: Commit immediately.  Pass False when the caller batches
+            several writes into one transaction.
+    """
     cur = conn.cursor()
+    ids_json = json.dumps(list(conversation_ids))
+    in_ids = "IN (SELECT value FROM json_each(?))"
+    # the external-content index needs the indexed text to remove entries,
+    # so this must run while the nodes still exist
+    cur.execute(
+        "INSERT INTO fts_messages (fts_messages, rowid, content) "
+        f"SELECT 'delete', rowid, content FROM nodes WHERE conversation_id {in_ids} AND {_FTS_INDEXED}",
+        (ids_json,),
+    )
     # delete from nodes and edges cascades due to foreign keys (but we still remove edges explicitly for clarity)
-    cur.execute("DELETE FROM edges WHERE conversation_id = ?", (conversation_id,))
-    cur.execute("DELETE FROM nodes WHERE conversation_id = ?", (conversation_id,))
-    cur.execute("DELETE FROM fts_messages WHERE conversation_id = ?", (conversation_id,))
-    cur.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
-    conn.commit()
+    cur.execute(f"DELETE FROM edges WHERE conversation_id {in_ids}", (ids_json,))
+    cur.execute(f"DELETE FROM nodes WHERE conversation_id {in_ids}", (ids_json,))
+    cur.execute(f"DELETE FROM conversations WHERE id {in_ids}", (ids_json,))
+    if commit:
+        conn.commit()
 
 
-def bulk_insert_nodes(conn: sqlite3.Connection, conversation_id: str, nodes_data: Iterable[Dict[str, Any]]) -> None:
+def bulk_insert_nodes(conn: sqlite3.Connection, conversation_id: str, nodes_data: Iterable[Dict[str, Any]], commit: bool = True) -> None:
     """Insert nodes and edges into the database.
 
+    Message content is not added to the FTS index here; call `rebuild_fts`
+    for the conversation once it is written.  Every node already stored must
+    be indexed when this is called: a node ID taken over from another
+    conversation is first removed from the index, since the external-content
+    index is not updated when `INSERT OR REPLACE` drops the old row.
+
     Args:
         conn: Database connection.
         conversation_id: Conversation ID for all nodes in this batch.
         nodes_data: Iterable of dicts with keys: id, parent_id, children (list), role,
             content, create_time.
+        commit: Commit immediately.  Pass False when the caller batches
+            several writes into one transaction.
     """
     cur = conn.cursor()
-    # prepare data for nodes and fts
-    node_rows = []
-    fts_rows = []
-    edge_rows = []
-    for nd in nodes_data:
-        node_rows.append(
-            (
-                nd["id"],
-                conversation_id,
-                nd.get("parent_id"),
-                nd.get("role"),
-                nd.get("content"),
-                nd.get("create_time"),
-            )
+    # columns are buffered as parallel lists (one per field) and zipped into
+    # executemany, flushing every INSERT_CHUNK_SIZE nodes
+    ids: list = []
+    parent_ids: list = []
+    roles: list = []
+    contents: list = []
+    create_times: list = []
+    edge_parents: list = []
+    edge_children: list = []
+
+    def flush() -> None:
+        conv_ids = repeat(conversation_id)
+        # unindex stored rows that the insert below is about to replace
+        cur.execute(
+            "INSERT INTO fts_messages (fts_messages, rowid, content) "
+            "SELECT 'delete', rowid, content FROM nodes "
+            f"WHERE id IN (SELECT value FROM json_each(?)) AND {_FTS_INDEXED}",
+            (json.dumps(ids),),
         )
-        # insert into fts only if there's content
-        if nd.get("content"):
-            fts_rows.append((nd["id"], conversation_id, nd["content"]))
-        # edges
-        for child in nd.get("children", []):
-            edge_rows.append((conversation_id, nd["id"], child))
-    # insert into nodes
-    cur.executemany(
-        """
-        INSERT OR REPLACE INTO nodes (id, conversation_id, parent_id, role, content, create_time)
-        VALUES (?, ?, ?, ?, ?, ?)
-        """,
-        node_rows,
-    )
-    # insert into edges
-    if edge_rows:
+        # insert into nodes
         cur.executemany(
-            """
-            INSERT OR REPLACE INTO edges (conversation_id, parent_id, child_id)
-            VALUES (?, ?, ?)
-            """,
-            edge_rows,
+            _INSERT_NODE_SQL,
+            zip(ids, conv_ids, parent_ids, roles, contents, create_times),
         )
-    # insert into fts
-    if fts_rows:
-        cur.executemany(
-            "INSERT INTO fts_messages (node_id, conversation_id, content) VALUES (?, ?, ?)",
-            fts_rows,
+        # insert into edges
+        cur.executemany(_INSERT_EDGE_SQL, zip(conv_ids, edge_parents, edge_children))
+        for column in (ids, parent_ids, roles, contents, create_times, edge_parents, edge_children):
+            column.clear()
+
+    for nd in nodes_data:
+        node_id = nd["id"]
+        ids.append(node_id)
+        parent_ids.append(nd.get("parent_id"))
+        roles.append(nd.get("role"))
+        contents.append(nd.get("content"))
+        create_times.append(nd.get("create_time"))
+        for child in nd.get("children", []):
+            edge_parents.append(node_id)
+            edge_children.append(child)
+        if len(ids) >= INSERT_CHUNK_SIZE:
+            flush()
+    if ids:
+        flush()
+    if commit:
+        conn.commit()
+
+
+def rebuild_fts(conn: sqlite3.Connection, conversation_ids: Iterable[str] | None = None, commit: bool = True) -> None:
+    """Populate the FTS index from the nodes table in a single statement.
+
+    Args:
+        conn: Database connection.
+        conversation_ids: Only index nodes of these conversations, whose
+            previous FTS rows must already have been removed (as
+            `delete_conversation` does).  If None, the whole index is
+            dropped and rebuilt.
+        commit: Commit immediately.  Pass False when the caller batches
+            several writes into one transaction.
+    """
+    if conversation_ids is None:
+        conn.execute("INSERT INTO fts_messages (fts_messages) VALUES ('delete-all')")
+        conn.execute(_INSERT_FTS_SQL)
+    else:
+        conn.execute(
+            _INSERT_FTS_SQL + " AND conversation_id IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(conversation_ids)),),
         )
-    conn.commit()
+    if commit:
+        conn.commit()
 
 
 def get_fingerprint(conn: sqlite3.Connection, conversation_id: str) -> str | None:
@@ -223,13 +427,20 @@ def get_fingerprint(conn: sqlite3.Connection, conversation_id: str) -> str | Non
     return row["fingerprint"] if row else None
 
 
-def set_state(conn: sqlite3.Connection, key: str, value: str) -> None:
+def get_fingerprints(conn: sqlite3.Connection) -> Dict[str, str]:
+    """Return a mapping of every stored conversation ID to its fingerprint."""
+    cur = conn.execute("SELECT id, fingerprint FROM conversations")
+    return dict(cur.fetchall())
+
+
+def set_state(conn: sqlite3.Connection, key: str, value: str, commit: bool = True) -> None:
     """Persist a key/value pair in the state table."""
     conn.execute(
         "INSERT INTO state (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
         (key, value),
     )
-    conn.commit()
+    if commit:
+        conn.commit()
 
 
 def get_state(conn: sqlite3.Connection, key: str) -> str | None:
@@ -9,20 +9,37 @@ ingest, the conversation is skipped to avoid unnecessary work.
 
 from __future__ import annotations
 
-import hashlib
 import json
 import os
+import queue
+import sqlite3
+import threading
 import time
 from datetime import datetime
-from typing import Dict, Any, Iterable
+from typing import Dict, Any, Iterable, Tuple
 
 import typer
-import ijson
+import xxhash
+
+try:
+    # the C backend tokenises JSON natively and is much faster on large exports
+    import ijson.backends.yajl2_c as ijson
+except ImportError:  # ijson built without the C extension
+    import ijson
 
 from . import db
 
 app = typer.Typer(name="ingest")
 
+# number of new/updated conversations written per transaction
+COMMIT_EVERY = 500
+
+# parsed conversations buffered between the parser thread and the writer
+QUEUE_SIZE = 256
+
+# marks the end of the parser's output on the queue
+_SENTINEL = object()
+
 
 def _compute_fingerprint(convo: Dict[str, Any]) -> str:
     """Compute a stable hash summarising key properties of a conversation.
@@ -31,12 +48,43 @@ def _compute_fingerprint(convo: Dict[str, Any]) -> str:
     and current node ID.  If any of these fields change, the fingerprint
     changes and ingestion will replace the stored data.
     """
-    conv_id = convo.get("id", "")
-    update_time = str(convo.get("update_time", ""))
-    mapping_len = str(len(convo.get("mapping", {})))
-    current_node = convo.get("current_node", "") or ""
-    parts = f"{conv_id}|{update_time}|{mapping_len}|{current_node}"
-    return hashlib.sha256(parts.encode("utf-8")).hexdigest()
+    # fields are formatted directly into one string
+    parts = (
+        f"{convo.get('id', '')}|{convo.get('update_time', '')}|"
+        f"{len(convo.get('mapping', {}))}|{convo.get('current_node', '') or ''}"
+    )
+    # a fast non-cryptographic hash is enough for change detection
+    return xxhash.xxh3_128_hexdigest(parts.encode("utf-8"))
+
+
+def _parse_node(node_id: str, node: Dict[str, Any]) -> Dict[str, Any] | None:
+    """Return a node dict prepared for DB insertion, or None if it has no message."""
+    message = node.get("message")
+    if not message:
+        # nodes without message payload (e.g., virtual root) are ignored
+        return None
+    author = message.get("author", {})
+    role = author.get("role")
+    content_obj = message.get("content", {})
+    content_parts = content_obj.get("parts", []) if content_obj else []
+    if len(content_parts) == 1:
+        # common single-part message; skip building a joined copy
+        content = content_parts[0] or ""
+    else:
+        content = "\n\n".join(p for p in content_parts if p)
+    create_time = None
+    # some exports include a message-level create_time in metadata
+    meta = message.get("metadata", {})
+    if isinstance(meta, dict):
+        create_time = meta.get("create_time") or meta.get("finish_time")
+    return {
+        "id": node_id,
+        "parent_id": node.get("parent"),
+        "children": node.get("children", []) or [],
+        "role": role,
+        "content": content,
+        "create_time": create_time,
+    }
 
 
 def _parse_nodes(convo: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
@@ -47,39 +95,75 @@ def _parse_nodes(convo: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
     """
     mapping = convo.get("mapping", {})
     for node_id, node in mapping.items():
-        message = node.get("message")
-        if not message:
-            # nodes without message payload (e.g., virtual root) are ignored
-            continue
-        author = message.get("author", {})
-        role = author.get("role")
-        content_obj = message.get("content", {})
-        content_parts = content_obj.get("parts", []) if content_obj else []
-        content = "\n\n".join(p for p in content_parts if p)
-        create_time = None
-        # some exports include a message-level create_time in metadata
-        meta = message.get("metadata", {})
-        if isinstance(meta, dict):
-            create_time = meta.get("create_time") or meta.get("finish_time")
-        yield {
-            "id": node_id,
-            "parent_id": node.get("parent"),
-            "children": node.get("children", []) or [],
-            "role": role,
-            "content": content,
-            "create_time": create_time,
-        }
+        parsed = _parse_node(node_id, node)
+        if parsed is not None:
+            yield parsed
+
+
+def _write_conversation(conn: sqlite3.Connection, convo: Dict[str, Any], fingerprint: str) -> None:
+    """Insert a conversation record, its current message, nodes and edges,
+    and add its messages to the FTS index."""
+    current_node = convo.get("current_node")
+    current = convo.get("mapping", {}).get(current_node) if current_node else None
+    last = _parse_node(current_node, current) if current else None
+    db.upsert_conversation(
+        conn,
+        convo,
+        fingerprint,
+        last_role=last["role"] if last else None,
+        last_content=last["content"] if last else None,
+        commit=False,
+    )
+    # parse nodes and edges
+    db.bulk_insert_nodes(conn, convo["id"], _parse_nodes(convo), commit=False)
+    # indexed straight away so that every stored node is in the index whenever
+    # a later write replaces or deletes it
+    db.rebuild_fts(conn, [convo["id"]], commit=False)
+
+
+def _produce(input_path: str, q: queue.Queue) -> None:
+    """Parse conversations from the export onto the queue.
+
+    Runs on a background thread so JSON parsing and fingerprinting overlap
+    with database writes.  Each conversation with an ID is queued as a
+    `(fingerprint, convo)` pair.  Any parse error is forwarded through the
+    queue, and the sentinel is always put last.
+    """
+    try:
+        with open(input_path, "rb") as f:
+            # use_float avoids Decimal values, which sqlite3 cannot bind
+            for convo in ijson.items(f, "item", use_float=True):
+                if convo.get("id"):
+                    q.put((_compute_fingerprint(convo), convo))
+    except Exception as exc:
+        q.put(exc)
+    finally:
+        q.put(_SENTINEL)
+
+
+def _consume(q: queue.Queue) -> Iterable[Tuple[str, Dict[str, Any]]]:
+    """Yield `(fingerprint, convo)` pairs from the queue until the sentinel is reached."""
+    while True:
+        item = q.get()
+        if item is _SENTINEL:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
 
 
 @app.command()
 def ingest(input: str = typer.Option(..., help="Path to conversations.json file"), db_path: str = typer.Option(..., help="Path to the SQLite DB")) -> None:
     """Ingest conversations from a ChatGPT export into the database.
 
-    This command opens the JSON file using ijson and processes each
-    conversation one at a time.  Conversations with unchanged fingerprints
-    since the last run are skipped.  New or updated conversations are
-    parsed into nodes and edges and inserted into the database.  A log of
-    the ingest run is recorded in the `ingest_runs` table.
+    This command streams the JSON file using ijson on a background thread
+    and processes each conversation as it is parsed.  Conversations with
+    unchanged fingerprints since the last run are skipped.  New or updated
+    conversations are parsed into nodes and edges and inserted into the
+    database.  Writes are batched into transactions of `COMMIT_EVERY`
+    conversations; updated conversations are held until the batch commits
+    so their old rows can be deleted together.  A log of the ingest run is
+    recorded in the `ingest_runs` table.
     """
     input_path = os.path.abspath(input)
     conn = db.get_connection(db_path)
@@ -88,29 +172,47 @@ def ingest(input: str = typer.Option(..., help="Path to conversations.json file"
     added = 0
     updated = 0
     skipped = 0
-    # open and stream
-    with open(input_path, "rb") as f:
-        parser = ijson.items(f, "item")
-        for convo in parser:
-            conv_id = convo.get("id")
-            if not conv_id:
-                continue
-            fingerprint = _compute_fingerprint(convo)
-            existing_fp = db.get_fingerprint(conn, conv_id)
-            if existing_fp and existing_fp == fingerprint:
-                skipped += 1
-                continue
-            # if conversation existed but fingerprint changed, delete old rows
-            if existing_fp:
-                db.delete_conversation(conn, conv_id)
-                updated += 1
-            else:
-                added += 1
-            # insert conversation record
-            db.upsert_conversation(conn, convo, fingerprint)
-            # parse nodes and edges
-            nodes_data = list(_parse_nodes(convo))
-            db.bulk_insert_nodes(conn, conv_id, nodes_data)
+    # conversations added in the current transaction
+    batch_ids: list[str] = []
+    # changed conversations waiting for their old rows to be deleted, by ID
+    pending_updates: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+    # fetch all stored fingerprints up front rather than one query per conversation
+    existing_fps = db.get_fingerprints(conn)
+
+    def flush() -> None:
+        if pending_updates:
+            db.delete_conversations(conn, pending_updates.keys(), commit=False)
+            for fingerprint, convo in pending_updates.values():
+                _write_conversation(conn, convo, fingerprint)
+        conn.commit()
+        batch_ids.clear()
+        pending_updates.clear()
+
+    # parse on a background thread; this thread owns the connection and writes
+    q: queue.Queue = queue.Queue(maxsize=QUEUE_SIZE)
+    producer = threading.Thread(target=_produce, args=(input_path, q), daemon=True)
+    producer.start()
+    conn.execute("BEGIN")
+    for fingerprint, convo in _consume(q):
+        conv_id = convo["id"]
+        existing_fp = existing_fps.get(conv_id)
+        if existing_fp and existing_fp == fingerprint:
+            skipped += 1
+            continue
+        if existing_fp:
+            # conversation existed but fingerprint changed; replaced on flush
+            pending_updates[conv_id] = (fingerprint, convo)
+            updated += 1
+        else:
+            _write_conversation(conn, convo, fingerprint)
+            batch_ids.append(conv_id)
+            added += 1
+        existing_fps[conv_id] = fingerprint
+        if len(batch_ids) + len(pending_updates) >= COMMIT_EVERY:
+            flush()
+            conn.execute("BEGIN")
+    flush()
+    producer.join()
     # record ingest run log
     conn.execute(
         """
@@ -139,10 +241,13 @@ def init_db(db_path: str = typer.Option(..., help="Path to the SQLite DB")) -> N
 
 @app.command()
 def build(db_path: str = typer.Option(..., help="Path to the SQLite DB")) -> None:
-    """Build auxiliary indices.  For this baseline implementation, all indices
-    are created during initialisation, so this command simply triggers a
-    VACUUM to reclaim space."""
+    """Build auxiliary indices.  The FTS index is rebuilt from scratch from
+    the nodes table, query planner statistics are refreshed and a VACUUM
+    reclaims space."""
     conn = db.get_connection(db_path)
+    db.init_db(conn)
+    db.rebuild_fts(conn)
+    conn.execute("PRAGMA optimize;")
     conn.execute("VACUUM;")
     conn.commit()
     typer.echo("Database optimised.")
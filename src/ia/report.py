@@ -1,44 +1,50 @@
 """Report generation for Intent Archaeology.
 
-Reads the JSON output produced by the analysis phase and renders a
-Markdown report using a Jinja2 template.  The template can be customised
-by editing `templates/report.md.j2`.
+Streams the JSON output produced by the analysis phase one project at a
+time and renders a Markdown report using a Jinja2 template, so memory use
+does not grow with the size of the findings file.  The template can be
+customised by editing `templates/report.md.j2`.
 """
 
 from __future__ import annotations
 
-import json
+import functools
 import os
-from typing import Any, Dict
 
+import ijson
 import typer
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from jinja2 import Environment, FileSystemLoader, Template
 
 app = typer.Typer(name="report")
 
+# templates directory, located relative to this file
+TEMPLATES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "templates"))
+
+
+@functools.lru_cache(maxsize=None)
+def _get_template(name: str) -> Template:
+    """Return the compiled template, building the Jinja environment once."""
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        # the output is Markdown, not HTML, so there is nothing to escape
+        autoescape=False,
+        trim_blocks=True,
+        lstrip_blocks=True,
+    )
+    return env.get_template(name)
+
 
 @app.command()
 def report(db_path: str = typer.Option(..., help="Path to SQLite DB (unused but kept for symmetry)"),
            findings: str = typer.Option(..., help="Path to analysis JSON file"),
            out: str = typer.Option(..., help="Path to write Markdown report")) -> None:
     """Generate a Markdown report from analysis findings."""
-    # load analysis results
-    with open(findings, "r", encoding="utf-8") as f:
-        data: Dict[str, Any] = json.load(f)
-    # locate the templates directory relative to this file
-    this_dir = os.path.dirname(os.path.abspath(__file__))
-    templates_dir = os.path.abspath(os.path.join(this_dir, "..", "..", "templates"))
-    env = Environment(
-        loader=FileSystemLoader(templates_dir),
-        autoescape=select_autoescape(["md"]),
-        trim_blocks=True,
-        lstrip_blocks=True,
-    )
-    tmpl = env.get_template("report.md.j2")
-    rendered = tmpl.render(projects=data.get("projects", []))
+    tmpl = _get_template("report.md.j2")
     # ensure output directory exists
     out_path = os.path.abspath(out)
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    with open(out_path, "w", encoding="utf-8") as f_out:
-        f_out.write(rendered)
+    # stream analysis results into the template and the rendered output to disk
+    with open(findings, "rb") as f:
+        projects = ijson.items(f, "projects.item", use_float=True)
+        tmpl.stream(projects=projects).dump(out_path, encoding="utf-8")
     typer.echo(f"Report written to {out}")